@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""Compare rs_cdr_generator benchmark runs.
+
+Each benchmark run is stored in its own directory under benchmark_results/,
+named by timestamp:
+
+    benchmark_results/
+        2026-08-25_14-30-00/
+            benchmark_results.json   # list of per-test results
+            system_info.json         # host/git metadata for the run
+
+A result entry looks like:
+
+    {
+        "description": "100k subs / 1 day",
+        "subscribers": 100000,
+        "days": 1,
+        "elapsed_seconds": 12.34,
+        "throughput_subs_per_sec": 8103,
+        "output_size_kb": 45678,
+        "max_memory_bytes": 123456789
+    }
+
+Usage:
+    ./compare_benchmarks.py                  # compare the two latest runs
+    ./compare_benchmarks.py --trends         # show history per subscriber count
+    ./compare_benchmarks.py --export-csv out.csv
+"""
+
+import argparse
+import csv
+import json
+import math
+import mmap
+import os
+import pickle
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from operator import itemgetter
+from pathlib import Path
+
+# NumPy collapses the per-row change/classification arithmetic into single
+# C-level array passes; plain lists are used when it is not installed.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# orjson decodes several times faster than stdlib json and benchmark
+# histories accumulate many files; fall back to stdlib when unavailable.
+try:
+    import orjson
+    _loads = orjson.loads
+    _JSONError = getattr(orjson, "JSONDecodeError", ValueError)
+except ImportError:
+    orjson = None
+    _loads = json.loads
+    _JSONError = json.JSONDecodeError
+
+
+_BYTES_TO_MB = 1.0 / (1024 * 1024)
+
+# Field accessors bound once at module scope; each inline r["key"] /
+# r.get("key", 0) in a row loop re-hashes the key string per row.
+_desc_of = itemgetter("description")
+_subs_of = itemgetter("subscribers")
+_elapsed_of = itemgetter("elapsed_seconds")
+_throughput_of = itemgetter("throughput_subs_per_sec")
+_size_kb_of = itemgetter("output_size_kb")
+_mem_bytes_of = itemgetter("max_memory_bytes")
+
+
+# Banners and table separators, built once instead of on every call.
+_BANNER_EQ = "=" * 80
+_SEP95 = "-" * 95
+_SEP85 = "-" * 85
+_SEP75 = "-" * 75
+_SEP70 = "-" * 70
+
+# Row formats for the table loops, bound once: a %-format on a constant
+# string is a single PyUnicode_Format call per row, where the equivalent
+# f-string re-runs a FORMAT_VALUE/BUILD_STRING sequence per field.
+_ROW_FMT = "%-30s %7.2fs (%5s s/s)  %7.2fs (%5s s/s)  %-15s %s"
+_MEM_ROW_FMT = "%-30s %11.1f MB %11.1f MB %-15s"
+_TREND_ROW_FMT = "%-22s %9.2fs %10s s/s %-15s"
+_SINGLE_ROW_FMT = "%-30s %9.2fs %10s s/s %10s KB"
+
+# Status labels shared by the threshold and z-score classifiers.
+_OK = "✓ OK"
+_FASTER = "✓✓ FASTER"
+_SLOWER = "⚠ SLOWER"
+_TREND_STABLE = "→ stable"
+
+
+def _percent_changes(prev_values, curr_values):
+    """Pairwise percent change; NaN where the previous value is zero."""
+    if np is not None:
+        prev_a = np.asarray(prev_values, dtype=np.float64)
+        curr_a = np.asarray(curr_values, dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(prev_a > 0, (curr_a - prev_a) / prev_a * 100.0, np.nan)
+    return [(c - p) / p * 100.0 if p > 0 else math.nan
+            for p, c in zip(prev_values, curr_values)]
+
+
+def _classify_changes(changes):
+    """Status label per percent change: stable within 5%, else faster/slower."""
+    if np is not None:
+        changes = np.asarray(changes, dtype=np.float64)
+        return np.select(
+            [np.isnan(changes), np.abs(changes) < 5, changes < 0],
+            ["", _OK, _FASTER],
+            default=_SLOWER)
+    return ["" if math.isnan(c) else
+            _OK if abs(c) < 5 else
+            _FASTER if c < 0 else
+            _SLOWER
+            for c in changes]
+
+
+# Bumped whenever the .parsed_cache.pkl entry layout changes; mismatched
+# caches are discarded and rebuilt.
+_CACHE_VERSION = 3
+
+# Results files at least this large are mmapped for decoding, so the parser
+# walks the page cache directly instead of copying the whole file into a
+# bytes object first; below it the setup cost isn't worth it.
+_MMAP_THRESHOLD = 64 * 1024
+
+# CSV exports with at least this many result rows are serialized through
+# pandas when it is installed; see export_csv.
+_PANDAS_EXPORT_THRESHOLD = 10_000
+
+# Number of historical runs the z-score regression check averages over.
+_ZSCORE_WINDOW = 10
+
+
+def _trend_labels(changes):
+    """Trend cell per consecutive delta. Stable rows all share one
+    preformatted label; only the minority that moved more than 5% pay for
+    embedding their percentage, and those are picked out with vectorized
+    masks when NumPy is around."""
+    if np is not None:
+        a = np.asarray(changes, dtype=np.float64)
+        labels = [_TREND_STABLE] * len(a)
+        nan_mask = np.isnan(a)
+        for j in np.flatnonzero(nan_mask):
+            labels[j] = ""
+        for j in np.flatnonzero(~nan_mask & (np.abs(a) >= 5)):
+            c = a[j]
+            labels[j] = f"↓ {c:+.1f}%" if c < 0 else f"↑ {c:+.1f}%"
+        return labels
+    return ["" if math.isnan(c) else
+            _TREND_STABLE if abs(c) < 5 else
+            f"↓ {c:+.1f}%" if c < 0 else
+            f"↑ {c:+.1f}%"
+            for c in changes]
+
+
+def _window_stats(values):
+    """Mean and population stddev of a window of elapsed times."""
+    if np is not None:
+        a = np.asarray(values, dtype=np.float64)
+        return float(a.mean()), float(a.std())
+    mu = sum(values) / len(values)
+    return mu, math.sqrt(sum((v - mu) ** 2 for v in values) / len(values))
+
+
+def _to_mb(byte_values):
+    if np is not None:
+        return np.asarray(byte_values, dtype=np.float64) * _BYTES_TO_MB
+    return [b * _BYTES_TO_MB for b in byte_values]
+
+
+@dataclass(slots=True)
+class Run:
+    """One benchmark run directory, with results pre-indexed by subscriber
+    count so the comparison methods never rescan the result list."""
+    timestamp: str
+    results: list
+    path: Path
+    by_subs: dict = field(init=False)
+    has_memory_stats: bool = field(init=False)
+    _system_info: dict = None
+
+    def __post_init__(self):
+        self.by_subs = {_subs_of(r): r for r in self.results}
+        # Computed once here; the comparison path checks it per run pair and
+        # would otherwise rescan the result list on every call.
+        self.has_memory_stats = any(_mem_bytes_of(r) > 0 for r in self.results)
+
+    @property
+    def system_info(self):
+        """system_info.json, parsed on first access. --trends never reads it
+        and CSV export only wants git_commit, so eager parsing would be
+        wasted work for half the subcommands."""
+        if self._system_info is None:
+            try:
+                with open(self.path / "system_info.json", "rb") as f:
+                    self._system_info = _loads(f.read())
+            except (_JSONError, json.JSONDecodeError, OSError):
+                self._system_info = {}
+        return self._system_info
+
+
+class BenchmarkComparator:
+    __slots__ = ("results_dir", "runs")
+
+    def __init__(self, results_dir="benchmark_results"):
+        self.results_dir = Path(results_dir)
+        self.runs = []
+
+    def load_all_results(self):
+        """Load every run directory under results_dir, oldest first.
+
+        Old runs are immutable, so parsed results are cached in a pickle
+        next to the run directories, keyed by benchmark_results.json's
+        mtime. Repeat invocations skip reparsing everything but new runs.
+        system_info.json is not read here at all; see Run.system_info.
+        """
+        if not self.results_dir.exists():
+            return
+        cache_file = self.results_dir / ".parsed_cache.pkl"
+        cache = {}
+        try:
+            with open(cache_file, "rb") as f:
+                payload = pickle.load(f)
+            if isinstance(payload, tuple) and payload[0] == _CACHE_VERSION:
+                cache = payload[1]
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            cache = {}
+
+        # scandir DirEntry objects carry the d_type from getdents, so is_dir()
+        # usually costs no extra stat, and sorting by name is a plain string
+        # compare instead of Path.__lt__.
+        with os.scandir(self.results_dir) as it:
+            run_dirs = sorted((e for e in it if e.is_dir()), key=lambda e: e.name)
+        if not run_dirs:
+            return
+
+        # Reads of independent run directories overlap on a small thread
+        # pool: stat/read syscalls of one run no longer serialize behind the
+        # decode of another. ex.map preserves the sorted directory order.
+        # The cache dict is only read on the workers; new entries are added
+        # on the main thread below.
+        with ThreadPoolExecutor(max_workers=min(16, len(run_dirs))) as ex:
+            parsed = list(ex.map(lambda e: self._parse_one_run(e, cache), run_dirs))
+
+        cache_dirty = False
+        for entry, item in zip(run_dirs, parsed):
+            if item is None:
+                continue
+            results_mtime, results, from_cache = item
+            if not from_cache:
+                cache[entry.name] = (results_mtime, results)
+                cache_dirty = True
+            self.runs.append(Run(entry.name, results, Path(entry.path)))
+
+        if cache_dirty:
+            try:
+                with open(cache_file, "wb") as f:
+                    pickle.dump((_CACHE_VERSION, cache), f, pickle.HIGHEST_PROTOCOL)
+            except OSError:
+                pass  # read-only results dir: just reparse next time
+
+    def _parse_one_run(self, entry, cache):
+        """Stat and parse one run directory's benchmark_results.json.
+
+        Runs on a worker thread. Returns (mtime, results, from_cache), or
+        None when the directory has no readable results file.
+        """
+        results_path = os.path.join(entry.path, "benchmark_results.json")
+        try:
+            st = os.stat(results_path)
+        except OSError:
+            return None  # no results file in this run directory
+        results_mtime = st.st_mtime
+
+        cached = cache.get(entry.name)
+        if cached is not None and cached[0] == results_mtime:
+            return results_mtime, cached[1], True
+        try:
+            with open(results_path, "rb") as f:
+                if st.st_size >= _MMAP_THRESHOLD:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        # orjson parses any buffer in place; stdlib json
+                        # still needs bytes, and mm[:] is a single copy.
+                        results = _loads(memoryview(mm) if orjson is not None
+                                         else mm[:])
+                else:
+                    results = _loads(f.read())
+        except (_JSONError, json.JSONDecodeError, OSError) as e:
+            print(f"Warning: skipping {entry.name}: {e}", file=sys.stderr)
+            return None
+        # Normalize field types and fill optional fields once, so the row
+        # loops need no float() casts or .get defaults. Normalized results
+        # land in the cache too (hence the _CACHE_VERSION bump to 3).
+        for r in results:
+            r["elapsed_seconds"] = float(r["elapsed_seconds"])
+            r.setdefault("throughput_subs_per_sec", 0)
+            r.setdefault("output_size_kb", 0)
+            r.setdefault("max_memory_bytes", 0)
+        return results_mtime, results, False
+
+    def show_single_run(self):
+        run = self.runs[-1]
+        lines = [
+            _BANNER_EQ,
+            f"BENCHMARK RUN {run.timestamp}",
+            f"Git commit: {run.system_info.get('git_commit', 'unknown')}",
+            _BANNER_EQ,
+            f"{'Test':<30} {'Time':>10} {'Throughput':>14} {'Output':>12}",
+            _SEP70,
+        ]
+        for result in run.results:
+            desc = _desc_of(result)
+            elapsed = _elapsed_of(result)
+            throughput = _throughput_of(result)
+            size_kb = _size_kb_of(result)
+            lines.append(_SINGLE_ROW_FMT % (desc, elapsed, throughput, size_kb))
+        sys.stdout.write("\n".join(lines) + "\n")
+
+    def compare_latest_two(self):
+        if len(self.runs) < 2:
+            if len(self.runs) == 1:
+                print("Only one benchmark run found, showing it instead.")
+                self.show_single_run()
+            else:
+                print("No benchmark results found.")
+            return
+
+        prev_run = self.runs[-2]
+        curr_run = self.runs[-1]
+
+        # Rows are accumulated and flushed with a single write at the end:
+        # one formatted print per row re-locks and may re-flush stdout each
+        # time, which dominates on long tables.
+        lines = [
+            _BANNER_EQ,
+            "BENCHMARK COMPARISON",
+            f"Previous: {prev_run.timestamp} "
+            f"(commit {prev_run.system_info.get('git_commit', 'unknown')})",
+            f"Current:  {curr_run.timestamp} "
+            f"(commit {curr_run.system_info.get('git_commit', 'unknown')})",
+            _BANNER_EQ,
+            f"{'Test':<30} {'Previous':>18} {'Current':>18}  {'Change':<15} {'Status'}",
+            _SEP95,
+        ]
+
+        # The matched pairs are gathered into columns so change/status are
+        # computed in one array pass and the loop below only formats.
+        curr_by_subs = curr_run.by_subs
+        pairs = [(p, curr_by_subs[_subs_of(p)])
+                 for p in prev_run.results
+                 if _subs_of(p) in curr_by_subs]
+
+        prev_times = [_elapsed_of(p) for p, _ in pairs]
+        curr_times = [_elapsed_of(c) for _, c in pairs]
+        changes = _percent_changes(prev_times, curr_times)
+        statuses = list(_classify_changes(changes))
+
+        # With enough history, judge the latest run against a rolling window
+        # of past times (3-sigma band) instead of the fixed 5% threshold:
+        # normal run-to-run jitter stops flagging SLOWER, and a real
+        # regression smaller than 5% still trips. Short histories keep the
+        # plain threshold from _classify_changes.
+        for idx, (prev_result, _) in enumerate(pairs):
+            subs = _subs_of(prev_result)
+            history = [_elapsed_of(run.by_subs[subs])
+                       for run in self.runs[:-1] if subs in run.by_subs]
+            if len(history) < _ZSCORE_WINDOW:
+                continue
+            mu, sd = _window_stats(history[-_ZSCORE_WINDOW:])
+            if sd <= 0:
+                continue
+            curr_time = curr_times[idx]
+            if curr_time > mu + 3 * sd:
+                statuses[idx] = _SLOWER
+            elif curr_time < mu - 3 * sd:
+                statuses[idx] = _FASTER
+            else:
+                statuses[idx] = _OK
+
+        for (prev_result, curr_result), prev_time, curr_time, change_pct, status in zip(
+                pairs, prev_times, curr_times, changes, statuses):
+            desc = _desc_of(prev_result)
+            prev_throughput = _throughput_of(prev_result)
+            curr_throughput = _throughput_of(curr_result)
+            change_str = "n/a" if math.isnan(change_pct) else f"{change_pct:+.1f}%"
+            lines.append(_ROW_FMT % (desc, prev_time, prev_throughput,
+                                     curr_time, curr_throughput, change_str, status))
+
+        if prev_run.has_memory_stats and curr_run.has_memory_stats:
+            lines.append("")
+            lines.append(f"{'Test':<30} {'Prev memory':>14} {'Curr memory':>14} {'Change':<15}")
+            lines.append(_SEP75)
+            prev_mems = _to_mb([_mem_bytes_of(p) for p, _ in pairs])
+            curr_mems = _to_mb([_mem_bytes_of(c) for _, c in pairs])
+            mem_changes = _percent_changes(prev_mems, curr_mems)
+            for (prev_result, _), prev_mem, curr_mem, mem_change in zip(
+                    pairs, prev_mems, curr_mems, mem_changes):
+                mem_change_str = "n/a" if math.isnan(mem_change) else f"{mem_change:+.1f}%"
+                lines.append(_MEM_ROW_FMT % (_desc_of(prev_result), prev_mem,
+                                             curr_mem, mem_change_str))
+
+        sys.stdout.write("\n".join(lines) + "\n")
+
+    def show_trends(self):
+        if not self.runs:
+            print("No benchmark results found.")
+            return
+
+        # Transpose in a single pass: every run contributes its rows to the
+        # per-subscriber-count series once, instead of probing each run's
+        # index again for every subscriber count.
+        series = defaultdict(list)
+        for run in self.runs:
+            timestamp = run.timestamp
+            for r in run.results:
+                series[_subs_of(r)].append((timestamp, _elapsed_of(r), _throughput_of(r)))
+
+        lines = [
+            _BANNER_EQ,
+            "BENCHMARK TRENDS",
+            _BANNER_EQ,
+        ]
+        for subs in sorted(series):
+            lines.append(f"\n{subs:,} subscribers:")
+            lines.append(f"{'Run':<22} {'Time':>10} {'Throughput':>14} {'Trend':<15}")
+            lines.append(_SEP85)
+            rows = series[subs]
+            times = [t for _, t, _ in rows]
+            trends = _trend_labels(_percent_changes(times[:-1], times[1:]))
+            lines.append(_TREND_ROW_FMT % (*rows[0], ""))
+            for (timestamp, elapsed, throughput), trend in zip(rows[1:], trends):
+                lines.append(_TREND_ROW_FMT % (timestamp, elapsed, throughput, trend))
+
+        sys.stdout.write("\n".join(lines) + "\n")
+
+    def export_csv(self, output_file):
+        if not self.runs:
+            print("No benchmark results found.")
+            return
+
+        header = ["timestamp", "git_commit", "subscribers", "days",
+                  "elapsed_seconds", "throughput_subs_per_sec",
+                  "output_size_kb", "max_memory_bytes"]
+
+        def rows():
+            for run in self.runs:
+                timestamp = run.timestamp
+                git_commit = run.system_info.get("git_commit", "unknown")
+                for result in run.results:
+                    yield (timestamp,
+                           git_commit,
+                           _subs_of(result),
+                           result["days"],
+                           _elapsed_of(result),
+                           _throughput_of(result),
+                           _size_kb_of(result),
+                           _mem_bytes_of(result))
+
+        # Histories past the threshold go through pandas' C serializer;
+        # below it (or without pandas) the stdlib writer wins, because
+        # importing pandas alone costs more than the whole export.
+        if sum(len(run.results) for run in self.runs) >= _PANDAS_EXPORT_THRESHOLD:
+            try:
+                import pandas as pd
+            except ImportError:
+                pass
+            else:
+                pd.DataFrame(list(rows()), columns=header).to_csv(
+                    output_file, index=False)
+                print(f"Exported {len(self.runs)} runs to {output_file}")
+                return
+
+        # Large buffer + writerows: the csv module consumes the generator in
+        # one C-level loop and rows are flushed in ~1 MB batches instead of
+        # one write() per row.
+        with open(output_file, "w", newline="", buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows())
+        print(f"Exported {len(self.runs)} runs to {output_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark runs")
+    parser.add_argument("--results-dir", default="benchmark_results",
+                        help="Directory with benchmark run subdirectories")
+    parser.add_argument("--trends", action="store_true",
+                        help="Show per-subscriber-count history across all runs")
+    parser.add_argument("--export-csv", metavar="FILE",
+                        help="Export all runs to a CSV file")
+    args = parser.parse_args()
+
+    comparator = BenchmarkComparator(args.results_dir)
+    comparator.load_all_results()
+
+    if args.export_csv:
+        comparator.export_csv(args.export_csv)
+    elif args.trends:
+        comparator.show_trends()
+    else:
+        comparator.compare_latest_two()
+
+
+if __name__ == "__main__":
+    main()